@@ -0,0 +1,226 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from recipes.batches import CommitBatch
+from recipes.models import Ingredient, Recipe, ShopCart, Tag
+from users.models import UserFollowing
+
+SHOPPING_LIST_TIMEOUT = 60 * 60
+FEED_TIMEOUT = 60 * 5
+ANONYMOUS_TIMEOUT = 60 * 10
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def feed_key(user_id):
+    return f'feed:{user_id}'
+
+
+def invalidate_feeds(user_ids):
+    cache.delete_many([feed_key(user_id) for user_id in user_ids])
+
+
+def catalog_version_key(model):
+    return f'catalog_version:{model._meta.label_lower}'
+
+
+def catalog_payload_key(model, version):
+    return f'catalog:{model._meta.label_lower}:{version}'
+
+
+def get_catalog_version(model):
+    """Версия справочника: время последнего изменения его записей."""
+    version = cache.get(catalog_version_key(model))
+    if version is None:
+        version = bump_catalog_version(model)
+    return version
+
+
+def bump_catalog_version(model):
+    version = time.time()
+    cache.set(catalog_version_key(model), version, None)
+    return version
+
+
+def shopping_list_key(user_id):
+    return f'shopping_list:{user_id}'
+
+
+def get_shopping_list(user):
+    """Сводный список покупок пользователя.
+
+    Результат агрегации хранится в кеше, пока сигналы из api/signals.py
+    не сбросят его при изменении корзины или состава рецептов.
+    """
+    key = shopping_list_key(user.id)
+    ingredients = cache.get(key)
+    if ingredients is None:
+        ingredients = list(Ingredient.objects.filter(
+            recipe_pass__recipe__shopping_cart__user=user
+        ).annotate(
+            amount=Sum("recipe_pass__amount")
+        ).values_list(
+            "name",
+            "measures",
+            "amount",
+        ).order_by("name"))
+        cache.set(key, ingredients, SHOPPING_LIST_TIMEOUT)
+    return ingredients
+
+
+def invalidate_shopping_lists(user_ids):
+    cache.delete_many([shopping_list_key(user_id) for user_id in user_ids])
+
+
+def get_tag_ids_by_slug():
+    """Соответствие слагов тегов их id из кеша справочника тегов."""
+    key = f'tag_slugs:{get_catalog_version(Tag)}'
+    tags = cache.get(key)
+    if tags is None:
+        tags = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tags, None)
+    return tags
+
+
+def recipe_version_key(recipe_id):
+    return f'recipe_version:{recipe_id}'
+
+
+def get_recipes_versions(recipe_ids):
+    """Версии, от которых зависят сериализованные рецепты, одним запросом."""
+    keys = {
+        recipe_version_key(recipe_id): recipe_id for recipe_id in recipe_ids
+    }
+    versions = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    catalogs = (get_catalog_version(Tag), get_catalog_version(Ingredient))
+    return {
+        recipe_id: (versions[key], *catalogs)
+        for key, recipe_id in keys.items()
+    }
+
+
+def get_recipe_versions(recipe_id):
+    return get_recipes_versions([recipe_id])[recipe_id]
+
+
+def bump_recipe_versions(recipe_ids):
+    version = time.time()
+    cache.set_many(
+        {recipe_version_key(recipe_id): version for recipe_id in recipe_ids},
+        None
+    )
+
+
+def get_recipes_list_versions():
+    """Версии, от которых зависит список рецептов."""
+    return tuple(
+        get_catalog_version(model) for model in (Recipe, Tag, Ingredient)
+    )
+
+
+def anonymous_response_key(request, versions):
+    """Ключ ответа для анонимного пользователя.
+
+    Параметры запроса нормализуются: порядок параметров и повторяющихся
+    значений не важен, format влияет только на рендеринг.
+    """
+    params = sorted(
+        (name, sorted(request.query_params.getlist(name)))
+        for name in request.query_params if name != 'format'
+    )
+    digest = hashlib.md5(repr(
+        (request.scheme, request.get_host(), request.path, params)
+    ).encode()).hexdigest()
+    return f'anonymous:{digest}:{join_versions(versions)}'
+
+
+def join_versions(versions):
+    return '-'.join(str(version) for version in versions)
+
+
+def recipe_fragment_key(request, recipe_id, versions):
+    """Ключ общей для всех пользователей части рецепта.
+
+    Ссылки на картинки абсолютные, поэтому в ключ входит адрес сайта.
+    """
+    origin = request.build_absolute_uri('/') if request else ''
+    digest = hashlib.md5(origin.encode()).hexdigest()
+    return f'recipe_fragment:{digest}:{recipe_id}:{join_versions(versions)}'
+
+
+def get_recipe_fragments(request, recipes, build):
+    """Общие для всех пользователей части рецептов по их id.
+
+    Недостающие в кеше части собирает build(recipes) и кладёт в кеш.
+    """
+    versions = get_recipes_versions([recipe.id for recipe in recipes])
+    keys = {
+        recipe.id: recipe_fragment_key(request, recipe.id, versions[recipe.id])
+        for recipe in recipes
+    }
+    cached = cache.get_many(keys.values())
+    fragments = {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items() if key in cached
+    }
+    missing = [recipe for recipe in recipes if recipe.id not in fragments]
+    if missing:
+        built = build(missing)
+        cache.set_many(
+            {keys[recipe_id]: fragment
+             for recipe_id, fragment in built.items()},
+            FRAGMENT_TIMEOUT
+        )
+        fragments.update(built)
+    return fragments
+
+
+# Сигналы из api/signals.py сбрасывают кеши только после коммита: иначе
+# параллельный запрос успеет положить в кеш старые данные под новой
+# версией. Батчи объединяют сигналы всех строк транзакции.
+
+
+def bump_catalog_versions(models):
+    for model in models:
+        bump_catalog_version(model)
+
+
+def invalidate_recipes_shopping_lists(recipe_ids):
+    invalidate_shopping_lists(ShopCart.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('user_id', flat=True))
+
+
+def invalidate_ingredients_shopping_lists(ingredient_ids):
+    invalidate_shopping_lists(ShopCart.objects.filter(
+        recipe__recipe_pass__ingredient_id__in=ingredient_ids
+    ).values_list('user_id', flat=True).distinct())
+
+
+def bump_authors_recipes(author_ids):
+    bump_catalog_version(Recipe)
+    bump_recipe_versions(Recipe.objects.filter(
+        author_id__in=author_ids).values_list('id', flat=True))
+
+
+def invalidate_followers_feeds(author_ids):
+    invalidate_feeds(UserFollowing.objects.filter(
+        author_id__in=author_ids
+    ).values_list('user_id', flat=True))
+
+
+catalogs = CommitBatch(bump_catalog_versions)
+recipe_versions = CommitBatch(bump_recipe_versions)
+shopping_lists = CommitBatch(invalidate_shopping_lists)
+recipes_shopping_lists = CommitBatch(invalidate_recipes_shopping_lists)
+ingredients_shopping_lists = CommitBatch(
+    invalidate_ingredients_shopping_lists)
+authors_recipes = CommitBatch(bump_authors_recipes)
+feeds = CommitBatch(invalidate_feeds)
+followers_feeds = CommitBatch(invalidate_followers_feeds)
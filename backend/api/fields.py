@@ -0,0 +1,96 @@
+import base64
+import binascii
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+ALLOWED_IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+class StreamingBase64ImageField(serializers.ImageField):
+    """Картинка в base64 или обычным файлом из multipart-запроса.
+
+    Base64 декодируется по частям во временный файл на диске, поэтому
+    в памяти не появляется вторая копия картинки. Размер проверяется
+    во время декодирования, формат и число пикселей — по заголовку,
+    без распаковки самого изображения.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            if data.size > settings.MAX_IMAGE_UPLOAD_SIZE:
+                self.fail_too_large()
+            file = data
+        elif isinstance(data, str) and data:
+            file = self.decode(data)
+        else:
+            raise serializers.ValidationError('Загрузите картинку')
+        try:
+            image_format = self.check_image(file)
+        except serializers.ValidationError:
+            file.close()
+            raise
+        if not isinstance(data, UploadedFile):
+            file.name = f'{uuid.uuid4()}.{ALLOWED_IMAGE_FORMATS[image_format]}'
+        return file
+
+    def decode(self, data):
+        if data.startswith('data:') and ';base64,' in data:
+            data = data[data.index(';base64,') + len(';base64,'):]
+        if len(data) * 3 // 4 > settings.MAX_IMAGE_UPLOAD_SIZE + 3:
+            self.fail_too_large()
+        file = TemporaryUploadedFile('upload', 'image', 0, None)
+        try:
+            self.decode_to(file, data)
+        except serializers.ValidationError:
+            file.close()
+            raise
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def decode_to(self, file, data):
+        rest = ''
+        for start in range(0, len(data), DECODE_CHUNK_SIZE):
+            chunk = rest + ''.join(
+                data[start:start + DECODE_CHUNK_SIZE].split())
+            usable = len(chunk) - len(chunk) % 4
+            rest = chunk[usable:]
+            try:
+                file.write(base64.b64decode(chunk[:usable], validate=True))
+            except binascii.Error:
+                raise serializers.ValidationError('Некорректный base64')
+            if file.tell() > settings.MAX_IMAGE_UPLOAD_SIZE:
+                self.fail_too_large()
+        if rest:
+            raise serializers.ValidationError('Некорректный base64')
+
+    def check_image(self, file):
+        try:
+            image = Image.open(file)
+        except (UnidentifiedImageError, OSError):
+            raise serializers.ValidationError('Файл не является картинкой')
+        if image.format not in ALLOWED_IMAGE_FORMATS:
+            raise serializers.ValidationError(
+                f'Формат {image.format} не поддерживается')
+        width, height = image.size
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            raise serializers.ValidationError(
+                'Слишком большое разрешение картинки')
+        file.seek(0)
+        return image.format
+
+    def fail_too_large(self):
+        raise serializers.ValidationError(
+            'Размер картинки не должен превышать '
+            f'{settings.MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)} МБ'
+        )
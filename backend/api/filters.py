@@ -1,23 +1,50 @@
+from datetime import datetime, time
+
+from django.db.models import Case, IntegerField, When
+from django.utils import timezone
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe, TagPass
+
+from .cache import get_tag_ids_by_slug
+from .search import ingredient_index, search_recipes
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
     )
 
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
-    created = filters.DateFilter(field_name='created', lookup_expr='gte')
+    created = filters.DateFilter(method='filter_created')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author', 'created',)
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tags = get_tag_ids_by_slug()
+        return queryset.filter(id__in=TagPass.objects.filter(
+            tag_id__in=[tags[slug] for slug in value if slug in tags]
+        ).values('recipe_id'))
+
+    def filter_created(self, queryset, name, value):
+        """Сравнение с началом дня, чтобы работал индекс по created."""
+        return queryset.filter(created__gte=timezone.make_aware(
+            datetime.combine(value, time.min)))
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     def filter_is_favorited(self, queryset, name, value):
         if value:
             return queryset.filter(favorite__user=self.request.user)
@@ -30,8 +57,15 @@ class RecipeFilter(FilterSet):
 
 
 class IngredientFilter(FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='icontains')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+    def filter_name(self, queryset, name, value):
+        ids = ingredient_index.search(value)
+        return queryset.filter(id__in=ids).order_by(Case(
+            *[When(id=pk, then=position) for position, pk in enumerate(ids)],
+            output_field=IntegerField()
+        ))
@@ -0,0 +1,128 @@
+from django.core.files.storage import default_storage
+from django.db.models import QuerySet
+
+from recipes.models import IngredientPass, Recipe, TagPass
+from .cache import get_recipe_fragments
+
+RECIPE_FIELDS = ("id", "tags", "author",
+                 "ingredients", "is_favorited", "is_in_shopping_cart",
+                 "name", "image", "thumbnail", "thumbnail_webp",
+                 "image_webp", "text", "cooking_time")
+RECIPE_FLAGS = ("is_favorited", "is_in_shopping_cart")
+RECIPE_IMAGES = ("image", "thumbnail", "thumbnail_webp", "image_webp")
+AUTHOR_FIELDS = ("email", "id", "username", "first_name", "last_name")
+
+
+class LeanSerializer:
+    """Сериализатор только для чтения: словари прямо из строк .values().
+
+    Повторяет вывод соответствующего ModelSerializer, но без разбора
+    полей на каждый объект. Подходит только для list и retrieve.
+    """
+    fields = ()
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @property
+    def data(self):
+        if self.many:
+            return self.to_representation(self.instance)
+        return self.to_representation([self.instance])[0]
+
+    def to_representation(self, objects):
+        if isinstance(objects, QuerySet):
+            return list(objects.values(*self.fields))
+        return [
+            {field: getattr(obj, field) for field in self.fields}
+            for obj in objects
+        ]
+
+
+class TagLeanSerializer(LeanSerializer):
+    fields = ("id", "name", "color", "slug")
+
+
+class IngredientLeanSerializer(LeanSerializer):
+    fields = ("id", "name", "measures")
+
+
+class RecipeLeanSerializer(LeanSerializer):
+    """Рецепты: общие части из кеша или из трёх запросов .values().
+
+    Флаги пользователя берутся из аннотаций queryset рецептов.
+    """
+
+    def to_representation(self, objects):
+        recipes = list(objects)
+        fragments = get_recipe_fragments(
+            self.context.get('request'), recipes, self.build_fragments)
+        return [
+            self.merge(fragments[recipe.id], recipe) for recipe in recipes
+        ]
+
+    def merge(self, fragment, recipe):
+        data = {}
+        for field in RECIPE_FIELDS:
+            if field in RECIPE_FLAGS:
+                data[field] = getattr(recipe, field)
+            else:
+                data[field] = fragment[field]
+        data['author'] = {
+            **fragment['author'],
+            'is_subscribed': recipe.author_is_subscribed
+        }
+        return data
+
+    def build_fragments(self, recipes):
+        ids = [recipe.id for recipe in recipes]
+        tags = {recipe_id: [] for recipe_id in ids}
+        for row in TagPass.objects.filter(recipe_id__in=ids).values(
+            'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+        ).order_by('tag_id'):
+            tags[row['recipe_id']].append({
+                'id': row['tag__id'],
+                'name': row['tag__name'],
+                'color': row['tag__color'],
+                'slug': row['tag__slug'],
+            })
+        ingredients = {recipe_id: [] for recipe_id in ids}
+        for row in IngredientPass.objects.filter(recipe_id__in=ids).values(
+            'recipe_id', 'ingredient__id', 'ingredient__name',
+            'ingredient__measures', 'amount'
+        ).order_by('id'):
+            ingredients[row['recipe_id']].append({
+                'id': row['ingredient__id'],
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measures'],
+                'amount': row['amount'],
+            })
+        fragments = {}
+        for row in Recipe.objects.filter(id__in=ids).values(
+            'id', 'name', 'text', 'cooking_time', *RECIPE_IMAGES,
+            *(f'author__{field}' for field in AUTHOR_FIELDS)
+        ):
+            recipe_id = row['id']
+            row['tags'] = tags[recipe_id]
+            row['ingredients'] = ingredients[recipe_id]
+            row['author'] = {
+                field: row[f'author__{field}'] for field in AUTHOR_FIELDS
+            }
+            for field in RECIPE_IMAGES:
+                row[field] = self.image_url(row[field])
+            fragments[recipe_id] = {
+                field: row[field]
+                for field in RECIPE_FIELDS if field not in RECIPE_FLAGS
+            }
+        return fragments
+
+    def image_url(self, name):
+        if not name:
+            return None
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
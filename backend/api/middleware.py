@@ -0,0 +1,78 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+
+from .metrics import collect_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Эндпоинт сделал больше SQL-запросов, чем ему разрешено."""
+
+
+def get_endpoint(request):
+    """Имя DRF-вьюхи и действия, например RecipesViewSet.list."""
+    match = request.resolver_match
+    view = getattr(match.func, 'cls', None) if match else None
+    if view is None:
+        return None
+    method = request.method.lower()
+    action = getattr(match.func, 'actions', {}).get(method, method)
+    return f'{view.__name__}.{action}'
+
+
+class InstrumentationMiddleware:
+    """Метрики запросов к API: число SQL-запросов, время БД, сериализации
+    и всего запроса, размер ответа.
+
+    Метрики уходят в заголовок Server-Timing и в лог api.middleware
+    одной JSON-строкой. Число запросов сверяется с QUERY_BUDGETS; при
+    QUERY_BUDGET_STRICT превышение бюджета поднимает исключение, чтобы
+    тесты падали на N+1.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+        total_time = time.perf_counter() - started
+        endpoint = get_endpoint(request)
+        if endpoint is None:
+            return response
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.queries} queries"',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+            f'total;dur={total_time * 1000:.1f}',
+        ))
+        logger.info(json.dumps({
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'serializer_ms': round(metrics.serializer_time * 1000, 1),
+            'total_ms': round(total_time * 1000, 1),
+            'size': size,
+        }))
+        self.check_budget(endpoint, metrics.queries)
+        return response
+
+    def check_budget(self, endpoint, queries):
+        budget = settings.QUERY_BUDGETS.get(endpoint)
+        if budget is None or queries <= budget:
+            return
+        message = (
+            f'{endpoint}: {queries} SQL-запросов при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,130 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .cache import (
+    ANONYMOUS_TIMEOUT,
+    anonymous_response_key,
+    catalog_payload_key,
+    get_catalog_version,
+    get_recipe_versions,
+    get_recipes_list_versions
+)
+from .metrics import TimedSerializer
+from .renderers import FastJSONRenderer
+
+CATALOG_TIMEOUT = 60 * 60 * 24
+
+
+class CatalogCacheMixin:
+    """Кеширование справочников, которые почти не меняются.
+
+    Сериализованный список хранится в кеше под текущей версией
+    справочника, а ETag и Last-Modified позволяют клиенту получить
+    304 Not Modified без повторной передачи данных.
+    """
+
+    def catalog_etag(self, request, *args, **kwargs):
+        version = get_catalog_version(self.queryset.model)
+        return f'{version}-{request.accepted_renderer.format}'
+
+    def catalog_last_modified(self, request, *args, **kwargs):
+        version = get_catalog_version(self.queryset.model)
+        return datetime.fromtimestamp(version, tz=timezone.utc)
+
+    def conditional(self, view):
+        return condition(
+            etag_func=self.catalog_etag,
+            last_modified_func=self.catalog_last_modified
+        )(view)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.cached_list)(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve)(request, *args, **kwargs)
+
+    def cached_list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        model = self.queryset.model
+        key = catalog_payload_key(model, get_catalog_version(model))
+        data = cache.get(key)
+        if data is None:
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            data = list(serializer.data)
+            cache.set(key, data, CATALOG_TIMEOUT)
+        return Response(data)
+
+
+class AnonymousCacheMixin:
+    """Кеширование списка и страницы рецепта для анонимных пользователей.
+
+    У анонимного пользователя флаги избранного, корзины и подписки всегда
+    False, поэтому ответ зависит только от параметров запроса и версий
+    данных: общей версии списка рецептов или версии отдельного рецепта.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.anonymous_cached(
+            get_recipes_list_versions, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        if not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        return self.anonymous_cached(
+            lambda: get_recipe_versions(int(pk)),
+            super().retrieve, request, *args, **kwargs)
+
+    def anonymous_cached(self, versions, view, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        key = anonymous_response_key(request, versions())
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, ANONYMOUS_TIMEOUT)
+        return response
+
+
+class FastReadMixin:
+    """Быстрый путь для list и retrieve, включается настройкой FAST_READ.
+
+    Вместо ModelSerializer используется lean_serializer_class, который
+    строит словари из .values(), а JSON рендерится через orjson. Вывод
+    совпадает с обычным путём побайтно.
+    """
+    lean_serializer_class = None
+    fast_actions = ('list', 'retrieve')
+
+    def is_fast_read(self):
+        return settings.FAST_READ and self.action in self.fast_actions
+
+    def get_serializer(self, *args, **kwargs):
+        if not self.is_fast_read():
+            return super().get_serializer(*args, **kwargs)
+        kwargs.setdefault('context', self.get_serializer_context())
+        return self.lean_serializer_class(*args, **kwargs)
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if not self.is_fast_read():
+            return renderers
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in renderers
+        ]
+
+
+class TimedSerializerMixin:
+    """Замеряет время сериализации для InstrumentationMiddleware."""
+
+    def get_serializer(self, *args, **kwargs):
+        return TimedSerializer(super().get_serializer(*args, **kwargs))
@@ -1,5 +1,151 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+from .cache import get_catalog_version
+
+COUNT_TIMEOUT = 60
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по плану запроса Postgres.
+
+    Возвращает None, если база не Postgres или по оценке строк немного
+    и дешевле посчитать их точно.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    rows = plan[0]['Plan']['Plan Rows']
+    return rows if rows > ESTIMATE_THRESHOLD else None
+
+
+def capped_count(queryset, limit=ESTIMATE_THRESHOLD):
+    """Точное число строк, но не больше limit + 1.
+
+    COUNT по подзапросу с LIMIT не читает строки дальше порога, поэтому
+    небольшие выборки считаются одним запросом без EXPLAIN.
+    """
+    return queryset.order_by()[:limit + 1].count()
+
+
+class CachedCountPaginator(Paginator):
+    def __init__(self, *args, count_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = capped_count(self.object_list)
+            if count > ESTIMATE_THRESHOLD:
+                count = estimate_count(self.object_list) or super().count
+            cache.set(self.count_key, count, COUNT_TIMEOUT)
+        return count
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class CachedCountPagination(LimitPageNumberPagination):
+    """Кеширует COUNT(*) для одинаковых наборов фильтров.
+
+    Ключ строится из пути, действия вьюхи, отсортированных параметров
+    запроса и версии таблицы, которую сбрасывают сигналы при изменении
+    записей: одинаковые параметры у list и cookable дают разный COUNT.
+    Фильтры, зависящие от пользователя, не кешируются.
+    """
+    ignored_params = ('page', 'limit', 'cursor', 'format')
+    uncached_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_key = self.get_count_key(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        return CachedCountPaginator(
+            queryset, page_size, count_key=self.count_key)
+
+    def get_count_key(self, queryset, request, view=None):
+        params = request.query_params
+        if any(param in params for param in self.uncached_params):
+            return None
+        signature = json.dumps([
+            request.path,
+            getattr(view, 'action', None),
+            sorted(
+                (key, sorted(params.getlist(key)))
+                for key in params
+                if key not in self.ignored_params
+            ),
+        ])
+        return 'count:{}:{}:{}'.format(
+            queryset.model._meta.label_lower,
+            get_catalog_version(queryset.model),
+            hashlib.md5(signature.encode()).hexdigest()
+        )
+
+
+class LimitCursorPagination(CursorPagination):
+    """Постраничная навигация по ключу сортировки без COUNT(*) и OFFSET.
+
+    Сортировка берётся из queryset или Meta.ordering модели, ответ
+    сохраняет поля обычной пагинации, count всегда null.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class LimitPageOrCursorPagination(LimitPageNumberPagination):
+    """Пагинация по номеру страницы или, если передан cursor, по ключу.
+
+    Первая страница в режиме курсора запрашивается с пустым cursor=.
+    """
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor = LimitCursorPagination()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(LimitPageOrCursorPagination, CachedCountPagination):
+    """Пагинация рецептов: курсор по запросу, иначе кешированный COUNT."""
@@ -0,0 +1,142 @@
+import csv
+import os
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Встроенные шрифты PDF не содержат кириллицы.
+PDF_FONT = 'DejaVuSans'
+PDF_FONT_PATH = os.path.join(
+    os.path.dirname(__file__), 'fonts', 'DejaVuSans.ttf')
+PDF_MARGIN = 50
+PDF_LEADING = 18
+
+
+class Echo:
+    """Псевдо-буфер: csv.writer пишет в него, а строка сразу отдаётся."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Сам список наследники отдают потоком через stream(ingredients),
+    render() нужен только для ответов с ошибками.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.error_text(data).encode(self.charset)
+
+    @staticmethod
+    def error_text(data):
+        if isinstance(data, dict):
+            return '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield 'Список покупок:\n'
+        for name, measure, amount in ingredients:
+            yield f'{name.capitalize()} {amount} {measure},\n'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Количество', 'Единица измерения'))
+        for name, measure, amount in ingredients:
+            yield writer.writerow((name.capitalize(), amount, measure))
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """Список покупок в PDF со встроенным шрифтом DejaVu Sans.
+
+    PDF собирается целиком в памяти и отдаётся одним куском: список
+    после агрегации короткий.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.build(self.error_text(data).splitlines())
+
+    def stream(self, ingredients):
+        yield self.build(
+            f'{name.capitalize()} — {amount} {measure}'
+            for name, measure, amount in ingredients
+        )
+
+    def build(self, lines):
+        if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(PDF_FONT, PDF_FONT_PATH))
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setTitle('Список покупок')
+        top = A4[1] - PDF_MARGIN
+        pdf.setFont(PDF_FONT, 16)
+        pdf.drawString(PDF_MARGIN, top, 'Список покупок')
+        pdf.setFont(PDF_FONT, 12)
+        y = top - 2 * PDF_LEADING
+        for line in lines:
+            if y < PDF_MARGIN:
+                pdf.showPage()
+                pdf.setFont(PDF_FONT, 12)
+                y = top
+            pdf.drawString(PDF_MARGIN, y, line)
+            y -= PDF_LEADING
+        pdf.save()
+        return buffer.getvalue()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же выводом, что и у стандартного.
+
+    Компактный вывод без экранирования не-ASCII символов, U+2028 и U+2029
+    экранируются. Даты, Decimal и ленивые строки отдаются кодировщику DRF,
+    поэтому совпадают побайтно. Отличаться может только запись float в
+    экспоненциальной форме, а в горячих ответах float нет. Без orjson,
+    с отступами или при других настройках JSON работает как JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None or orjson is None
+            or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=(
+                orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS
+            )
+        )
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,112 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector
+)
+from django.db import connections
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+
+from recipes.models import Ingredient, IngredientPass, SearchTerm
+from recipes.search import SEARCH_CONFIG, search_terms
+from .cache import get_catalog_version
+
+INGREDIENT_SEARCH_LIMIT = 20
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса.
+
+    Названия хранятся отсортированными, поэтому совпадения по префиксу
+    находятся двоичным поиском, а поиск по подстроке проходит только
+    по строкам в памяти. Индекс перестраивается, когда меняется версия
+    справочника ингредиентов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._data = (None, [], [])
+
+    def _load(self):
+        version, names, ids = self._data
+        current = get_catalog_version(Ingredient)
+        if version == current:
+            return names, ids
+        with self._lock:
+            rows = sorted(
+                (name.lower(), pk)
+                for pk, name in Ingredient.objects.values_list('id', 'name')
+            )
+            names = [name for name, _ in rows]
+            ids = [pk for _, pk in rows]
+            self._data = (current, names, ids)
+        return names, ids
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        """Id ингредиентов: сначала совпадения с начала, потом подстрока."""
+        names, ids = self._load()
+        query = query.lower()
+        start = bisect_left(names, query)
+        end = bisect_right(names, query + '\U0010ffff', lo=start)
+        found = ids[start:min(end, start + limit)]
+        for position, name in enumerate(names):
+            if len(found) >= limit:
+                break
+            if start <= position < end:
+                continue
+            if query in name:
+                found.append(ids[position])
+        return found
+
+
+ingredient_index = IngredientIndex()
+
+
+def search_recipes(queryset, text):
+    """Полнотекстовый поиск рецептов с сортировкой по релевантности.
+
+    На Postgres используется to_tsvector по search_document и GIN-индекс
+    из миграции recipes 0011. На остальных базах каждое слово запроса
+    ищется как начало слова в индексе SearchTerm, а совпадение с названием
+    рецепта поднимается выше.
+    """
+    ordering = ('-search_rank', *queryset.model._meta.ordering)
+    if connections[queryset.db].vendor == 'postgresql':
+        vector = SearchVector('search_document', config=SEARCH_CONFIG)
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=SearchRank(vector, query)
+        ).filter(search_vector=query).order_by(*ordering)
+    for word in search_terms(text):
+        # Диапазон вместо LIKE: сравнение строк идёт по индексу.
+        queryset = queryset.filter(id__in=SearchTerm.objects.filter(
+            term__gte=word, term__lt=word + '\U0010ffff'
+        ).values('recipe_id'))
+    return queryset.annotate(search_rank=Case(
+        When(name__icontains=text, then=Value(1.0)),
+        default=Value(0.5),
+        output_field=FloatField()
+    )).order_by(*ordering)
+
+
+def match_recipes(queryset, ingredient_ids):
+    """Рецепты, которые можно приготовить из данных ингредиентов.
+
+    IngredientPass работает как обратный индекс: сначала по индексу
+    ingredient_id выбираются рецепты хотя бы с одним ингредиентом, затем
+    одна группировка считает долю имеющихся ингредиентов рецепта.
+    """
+    return queryset.filter(id__in=IngredientPass.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values('recipe_id')).annotate(
+        matched=Count(
+            'recipe_pass',
+            filter=Q(recipe_pass__ingredient_id__in=ingredient_ids)
+        ),
+        total=Count('recipe_pass'),
+    ).annotate(
+        coverage=Cast('matched', FloatField()) / F('total')
+    ).order_by('-coverage', '-matched', *queryset.model._meta.ordering)
@@ -1,6 +1,9 @@
 import re
+from collections import OrderedDict
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer
 from drf_extra_fields.fields import Base64ImageField
@@ -11,6 +14,8 @@ from recipes.models import (
     Favorite, Ingredient, IngredientPass, Recipe, ShopCart, Tag
 )
 from users.models import UserFollowing
+from .cache import get_recipe_fragments, recipes_shopping_lists
+from .fields import StreamingBase64ImageField
 
 User = get_user_model()
 
@@ -52,6 +57,13 @@ class UserSerializer(serializers.ModelSerializer):
         return False
 
 
+class AuthorSerializer(UserSerializer):
+    "Автор рецепта без подписки: она зависит от читателя и не кешируется"
+
+    class Meta(UserSerializer.Meta):
+        fields = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
 class TagSerializer(serializers.ModelSerializer):
     "Сериалайзер для тегов"
 
@@ -71,8 +83,8 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 class IngredientForSerializer(serializers.ModelSerializer):
     "Сериалайзер для подключение интгредиентов к рецепту"
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), source="ingredient.id")
+    id = serializers.ReadOnlyField(
+        source="ingredient.id")
     name = serializers.ReadOnlyField(
         source="ingredient.name")
     measurement_unit = serializers.ReadOnlyField(
@@ -83,10 +95,23 @@ class IngredientForSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipesListSerializer(serializers.ListSerializer):
+    "Список рецептов: общие части читаются из кеша одним запросом"
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        self.child.load_fragments(recipes)
+        return [self.child.to_representation(recipe) for recipe in recipes]
+
+
 class RecipesSerializer(serializers.ModelSerializer):
-    "Показ рецепта по GET запросу"
+    """Показ рецепта по GET запросу.
+
+    Всё, кроме флагов пользователя, одинаково для всех и хранится в кеше
+    под версией рецепта; флаги подставляются при каждом запросе.
+    """
     tags = TagSerializer(read_only=True, many=True)
-    author = UserSerializer(read_only=True)
+    author = AuthorSerializer(read_only=True)
     ingredients = IngredientForSerializer(many=True,
                                           read_only=True,
                                           source="recipe_pass")
@@ -94,26 +119,109 @@ class RecipesSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
 
+    fragment_fields = ("id", "tags", "author", "ingredients", "name",
+                       "image", "thumbnail", "thumbnail_webp",
+                       "image_webp", "text", "cooking_time")
+
     class Meta:
         model = Recipe
         fields = ("id", "tags", "author",
                   "ingredients", "is_favorited", "is_in_shopping_cart",
-                  "name", "image", "text", "cooking_time")
+                  "name", "image", "thumbnail", "thumbnail_webp",
+                  "image_webp", "text", "cooking_time")
         read_only_fields = ['is_favorited', 'is_in_shopping_cart']
+        list_serializer_class = RecipesListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = {}
+
+    def to_representation(self, instance):
+        fragment = self.fragments.pop(instance.id, None)
+        if fragment is None:
+            fragment = self.load_fragments([instance]).pop(instance.id)
+        data = OrderedDict()
+        for field in self._readable_fields:
+            name = field.field_name
+            if name in fragment:
+                data[name] = fragment[name]
+            else:
+                data.update(self.represent(instance, [field]))
+        data['author'] = {
+            **data['author'],
+            'is_subscribed': self.get_author_is_subscribed(instance)
+        }
+        return data
+
+    def load_fragments(self, recipes):
+        """Достаёт общие части рецептов из кеша, недостающие собирает."""
+        self.fragments.update(get_recipe_fragments(
+            self.context.get('request'), recipes, self.build_fragments))
+        return self.fragments
+
+    def build_fragments(self, recipes):
+        prefetch_related_objects(
+            recipes,
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'recipe_pass',
+                queryset=IngredientPass.objects.select_related(
+                    'ingredient').order_by('id')
+            )
+        )
+        fields = [
+            field for field in self._readable_fields
+            if field.field_name in self.fragment_fields
+        ]
+        return {
+            recipe.id: self.represent(recipe, fields) for recipe in recipes
+        }
+
+    def represent(self, instance, fields):
+        data = OrderedDict()
+        for field in fields:
+            attribute = field.get_attribute(instance)
+            data[field.field_name] = (
+                None if attribute is None
+                else field.to_representation(attribute)
+            )
+        return data
+
+    def get_author_is_subscribed(self, obj):
+        if hasattr(obj, 'author_is_subscribed'):
+            return obj.author_is_subscribed
+        user = self.context.get('request').user
+        if user.is_authenticated:
+            return UserFollowing.objects.filter(
+                user=user, author_id=obj.author_id).exists()
+        return False
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_authenticated:
             return Favorite.objects.filter(recipe=obj, user=user).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_authenticated:
             return ShopCart.objects.filter(recipe=obj, user=user).exists()
         return False
 
 
+class CookableRecipesSerializer(RecipesSerializer):
+    "Рецепт с долей ингредиентов, которые есть у пользователя"
+    matched = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipesSerializer.Meta):
+        fields = RecipesSerializer.Meta.fields + ("matched", "coverage")
+
+
 class TagWrite(serializers.ModelSerializer):
     "Сериалайзер для подключения тега"
     id = serializers.IntegerField()
@@ -123,68 +231,131 @@ class TagWrite(serializers.ModelSerializer):
         fields = ('id')
 
 
+class IngredientWrite(serializers.Serializer):
+    "Сериалайзер для записи ингредиента в рецепт"
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField()
+
+
 class SmallRecipeSerializer(serializers.ModelSerializer):
     "Сериалайзер для отображения рецепта"
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
-        read_only_fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'thumbnail', 'thumbnail_webp',
+                  'cooking_time')
+        read_only_fields = fields
 
 
 class CreateOrUpdateRecipes(serializers.ModelSerializer):
     "Сериалайзер для создания и обновления рецепта"
-    tags = serializers.PrimaryKeyRelatedField(many=True,
-                                              queryset=Tag.objects.all())
+    tags = serializers.ListField(child=serializers.IntegerField())
     author = serializers.HiddenField(
         default=serializers.CurrentUserDefault())
-    ingredients = IngredientForSerializer(
+    ingredients = IngredientWrite(
         many=True)
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'name', 'image', 'text', 'cooking_time')
 
+    def save(self, **kwargs):
+        """Закрывает временный файл картинки, даже если он уже перемещён."""
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
+    def validate_tags(self, value):
+        """Все теги загружаются одним запросом"""
+        tags = Tag.objects.in_bulk(value)
+        missing = [pk for pk in value if pk not in tags]
+        if missing:
+            raise serializers.ValidationError(
+                f"Теги не найдены: {missing}")
+        return [tags[pk] for pk in dict.fromkeys(value)]
+
     def validate_ingredients(self, value):
-        """Валидация ингредиентов по уникальности"""
-        existing_ingredients = []
-        for ingredient in value:
-            if ingredient['ingredient']['id'] in existing_ingredients:
-                raise serializers.ValidationError("Ингредиент уже добавлен")
-            existing_ingredients.append(ingredient['ingredient']['id'])
-        return value
+        """Валидация ингредиентов по уникальности и наличию в базе"""
+        ids = [ingredient['id'] for ingredient in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Ингредиент уже добавлен")
+        ingredients = Ingredient.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in ingredients]
+        if missing:
+            raise serializers.ValidationError(
+                f"Ингредиенты не найдены: {missing}")
+        return [
+            {
+                'ingredient': ingredients[ingredient['id']],
+                'amount': ingredient['amount'],
+            }
+            for ingredient in value
+        ]
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         recipe = super().create(validated_data)
-
-        ingredient_passes = [
+        IngredientPass.objects.bulk_create([
             IngredientPass(
                 recipe=recipe,
-                ingredient=ingredient.get("ingredient").get("id"),
-                amount=ingredient.get("amount"),
+                ingredient=ingredient['ingredient'],
+                amount=ingredient['amount'],
             )
             for ingredient in ingredients
-        ]
-        IngredientPass.objects.bulk_create(ingredient_passes)
-
+        ])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
+        ingredients = validated_data.pop('ingredients', None)
         recipe = super().update(instance, validated_data)
-        for ingredient in ingredients:
-            IngredientPass.objects.update_or_create(
-                recipe=recipe,
-                ingredient=ingredient.get("ingredient").get("id"),
-                defaults={
-                    "amount": ingredient.get("amount")
-                }
-            )
+        if ingredients is not None:
+            self.update_ingredients(recipe, ingredients)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        """Приводит состав рецепта к переданному, меняя только разницу."""
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        existing = {
+            ingredient_pass.ingredient_id: ingredient_pass
+            for ingredient_pass in recipe.recipe_pass.all()
+        }
+        removed = [
+            ingredient_pass.id
+            for ingredient_id, ingredient_pass in existing.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, ingredient_pass in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and ingredient_pass.amount != amount:
+                ingredient_pass.amount = amount
+                changed.append(ingredient_pass)
+        added = [
+            IngredientPass(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        if removed:
+            # Сигналы строк только копят id рецепта до коммита.
+            IngredientPass.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientPass.objects.bulk_update(changed, ['amount'])
+        if added:
+            IngredientPass.objects.bulk_create(added)
+        if removed or changed or added:
+            recipes_shopping_lists.add([recipe.id])
+
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
@@ -200,7 +371,7 @@ class RegisterSerializer(UserCreateSerializer):
 
 
 class UserFollowersSerializer(serializers.ModelSerializer):
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField(source='author.recipes_count')
 
     class Meta:
         model = UserFollowing
@@ -225,13 +396,10 @@ class UserFollowersSerializer(serializers.ModelSerializer):
 
         return data
 
-    def get_recipes_count(self, user_following):
-        return user_following.author.recipes.count()
-
 
 class FollowGetSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -245,17 +413,9 @@ class FollowGetSerializer(serializers.ModelSerializer):
             "recipes_count"
         )
 
-    def get_recipes_count(self, user_following):
-        return user_following.recipes.count()
-
     def get_recipes(self, obj):
-        queryset = obj.recipes.all()
-        request = self.context.get('request')
-        take_limit = request.GET.get('recipes_limit')
-        if take_limit is not None:
-            take_limit = int(take_limit)
-            queryset = queryset[:take_limit]
-        return SmallRecipeSerializer(queryset, many=True).data
+        """Рецепты автора, уже ограниченные recipes_limit во вьюсете."""
+        return SmallRecipeSerializer(obj.recipes.all(), many=True).data
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
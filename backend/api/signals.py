@@ -0,0 +1,102 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import (
+    Favorite, Ingredient, IngredientPass, Recipe, ShopCart, Tag, TagPass
+)
+from recipes.renditions import renditions_saved
+from recipes.search import search_rebuilt
+from users.models import User, UserFollowing
+from .cache import (
+    authors_recipes,
+    catalogs,
+    feeds,
+    followers_feeds,
+    ingredients_shopping_lists,
+    recipe_versions,
+    recipes_shopping_lists,
+    shopping_lists
+)
+
+
+@receiver((post_save, post_delete), sender=ShopCart)
+def shop_cart_changed(sender, instance, **kwargs):
+    shopping_lists.add([instance.user_id])
+
+
+@receiver((post_save, post_delete), sender=IngredientPass)
+def ingredient_pass_changed(sender, instance, **kwargs):
+    recipes_shopping_lists.add([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        ingredients_shopping_lists.add([instance.id])
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_catalog_changed(sender, **kwargs):
+    catalogs.add([Ingredient])
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_catalog_changed(sender, **kwargs):
+    catalogs.add([Tag])
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientPass)
+@receiver((post_save, post_delete, m2m_changed), sender=TagPass)
+def recipes_changed(sender, **kwargs):
+    catalogs.add([Recipe])
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    recipe_versions.add([instance.id])
+
+
+@receiver((post_save, post_delete), sender=IngredientPass)
+@receiver((post_save, post_delete), sender=TagPass)
+def recipe_relation_changed(sender, instance, **kwargs):
+    recipe_versions.add([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=TagPass)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        recipe_versions.add(Recipe.objects.filter(
+            tags=instance).values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        recipe_versions.add((pk_set or []) if reverse else [instance.id])
+
+
+@receiver(renditions_saved, sender=Recipe)
+def recipe_renditions_saved(sender, recipe_id, **kwargs):
+    catalogs.add([Recipe])
+    recipe_versions.add([recipe_id])
+
+
+@receiver(search_rebuilt, sender=Recipe)
+def recipe_search_rebuilt(sender, **kwargs):
+    catalogs.add([Recipe])
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(['last_login']):
+        return
+    authors_recipes.add([instance.id])
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def author_recipes_changed(sender, instance, **kwargs):
+    followers_feeds.add([instance.author_id])
+
+
+@receiver((post_save, post_delete), sender=UserFollowing)
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShopCart)
+def user_feed_changed(sender, instance, **kwargs):
+    feeds.add([instance.user_id])
@@ -0,0 +1,451 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from .cache import (
+    get_recipe_versions, get_shopping_list, shopping_list_key
+)
+from .serializers import RecipesSerializer, UserSerializer
+
+from recipes.models import (
+    Favorite, Ingredient, IngredientPass, Recipe, ShopCart, Tag, TagPass
+)
+from users.models import User, UserFollowing
+
+# Копии картинки уже готовы: их обработка не попадает в подсчёт запросов.
+IMAGE = 'recipes/images/test.png'
+IMAGE_WEBP = 'recipes/renditions/test_image_webp.webp'
+
+# Без полнотекстового поиска Postgres слова рецепта пишутся в SearchTerm.
+SEARCH_TERM_QUERIES = 0 if connection.vendor == 'postgresql' else 2
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FoodgramTestCase(APITestCase):
+    "Общие данные: автор, читатель, теги и справочник ингредиентов"
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.author = User.objects.create_user(
+                email='author@example.com', username='author',
+                first_name='Автор', last_name='Автор',
+                password='pass12345678')
+            cls.reader = User.objects.create_user(
+                email='reader@example.com', username='reader',
+                first_name='Читатель', last_name='Читатель',
+                password='pass12345678')
+            Tag.objects.bulk_create(
+                Tag(name=f'Тег {number}', color=f'#00000{number}',
+                    slug=f'tag{number}')
+                for number in range(3)
+            )
+            cls.tags = list(Tag.objects.order_by('id'))
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f'Ингредиент {number}', measures='г')
+                for number in range(60)
+            )
+            cls.ingredients = list(Ingredient.objects.order_by('id'))
+
+    @classmethod
+    def create_recipes(cls, count):
+        """Рецепты обоих пользователей по три ингредиента и два тега."""
+        authors = (cls.author, cls.reader)
+        with cls.captureOnCommitCallbacks(execute=True):
+            for number in range(count):
+                recipe = Recipe.objects.create(
+                    author=authors[number % 2],
+                    name=f'Рецепт {number}',
+                    text='Описание',
+                    cooking_time=10,
+                    image=IMAGE,
+                    image_webp=IMAGE_WEBP
+                )
+                IngredientPass.objects.bulk_create(
+                    IngredientPass(recipe=recipe, ingredient=ingredient,
+                                   amount=number + 1)
+                    for ingredient in cls.ingredients[number:number + 3]
+                )
+                TagPass.objects.bulk_create(
+                    TagPass(recipe=recipe, tag=tag) for tag in cls.tags[:2]
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_recipe(self, ingredients, tags=None, author=None):
+        """Рецепт, сохранённый как после коммита: кеши уже сброшены."""
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=author or self.author,
+                name=f'Рецепт {Recipe.objects.count()}',
+                text='Описание',
+                cooking_time=10,
+                image=IMAGE,
+                image_webp=IMAGE_WEBP
+            )
+            IngredientPass.objects.bulk_create(
+                IngredientPass(recipe=recipe, ingredient=ingredient,
+                               amount=1)
+                for ingredient in ingredients
+            )
+            TagPass.objects.bulk_create(
+                TagPass(recipe=recipe, tag=tag)
+                for tag in (self.tags[:1] if tags is None else tags)
+            )
+        return recipe
+
+    def add_to_cart(self, recipe, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ShopCart.objects.create(
+                user=user or self.reader, recipe=recipe)
+
+
+class RecipeUpdateQueriesTest(FoodgramTestCase):
+    "Обновление и удаление рецепта не зависят от числа ингредиентов"
+
+    def replace_ingredients(self, count, queries):
+        recipe = self.create_recipe(self.ingredients[:count])
+        self.add_to_cart(recipe)
+        self.client.force_authenticate(self.author)
+        ingredients = [
+            {'id': ingredient.id, 'amount': 2}
+            for ingredient in self.ingredients[30:30 + count]
+        ]
+        with self.assertNumQueries(queries), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{recipe.id}/',
+                {'ingredients': ingredients, 'tags': [self.tags[0].id]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            sorted(recipe.recipe_pass.values_list('ingredient_id', flat=True)),
+            [ingredient['id'] for ingredient in ingredients]
+        )
+
+    def delete_recipe(self, count, queries):
+        recipe = self.create_recipe(self.ingredients[:count])
+        self.add_to_cart(recipe)
+        self.client.force_authenticate(self.author)
+        with self.assertNumQueries(queries), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(IngredientPass.objects.filter(recipe=recipe).exists())
+
+    def test_replace_few_ingredients(self):
+        self.replace_ingredients(3, 19 + SEARCH_TERM_QUERIES)
+
+    def test_replace_many_ingredients(self):
+        self.replace_ingredients(30, 19 + SEARCH_TERM_QUERIES)
+
+    def test_delete_few_ingredients(self):
+        self.delete_recipe(3, 15)
+
+    def test_delete_many_ingredients(self):
+        self.delete_recipe(30, 15)
+
+
+class CountCacheTest(FoodgramTestCase):
+    "Кешированный COUNT не переносится между эндпоинтами"
+
+    def test_list_and_cookable_counts_differ(self):
+        for _ in range(3):
+            self.create_recipe(self.ingredients[1:3])
+        self.create_recipe(self.ingredients[:1])
+        params = f'?ingredients={self.ingredients[0].id}&limit=5'
+        response = self.client.get(f'/api/recipes/{params}')
+        self.assertEqual(response.data['count'], 4)
+        response = self.client.get(f'/api/recipes/cookable/{params}')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class RecipeListQueriesTest(FoodgramTestCase):
+    "Число запросов списка рецептов не зависит от размера страницы"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.create_recipes(12)
+
+    def get_list(self, limit, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(f'/api/recipes/?limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+        return response
+
+    def test_anonymous(self):
+        for limit in (2, 10):
+            cache.clear()
+            self.get_list(limit, 4)
+            self.get_list(limit, 0)
+
+    def test_authenticated(self):
+        self.client.force_authenticate(self.reader)
+        for limit in (2, 10):
+            cache.clear()
+            self.get_list(limit, 4)
+
+
+class ShoppingListCacheTest(FoodgramTestCase):
+    "Кеш списка покупок сбрасывается при изменении его источников"
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(self.ingredients[:3])
+        self.add_to_cart(self.recipe)
+        self.key = shopping_list_key(self.reader.id)
+        get_shopping_list(self.reader)
+
+    def assertInvalidated(self):
+        self.assertIsNone(cache.get(self.key))
+        return get_shopping_list(self.reader)
+
+    def test_invalidated_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            ShopCart.objects.filter(user=self.reader).delete()
+            self.assertIsNotNone(cache.get(self.key))
+        self.assertIsNotNone(cache.get(self.key))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.assertInvalidated(), [])
+
+    def test_cart_item_added(self):
+        other = self.create_recipe(self.ingredients[3:4])
+        self.add_to_cart(other)
+        self.assertEqual(len(self.assertInvalidated()), 4)
+
+    def test_cart_item_removed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ShopCart.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.assertInvalidated(), [])
+
+    def test_ingredient_pass_edited(self):
+        ingredient_pass = self.recipe.recipe_pass.first()
+        ingredient_pass.amount = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient_pass.save()
+        self.assertIn(
+            (ingredient_pass.ingredient.name, 'г', 5),
+            self.assertInvalidated()
+        )
+
+    def test_ingredient_pass_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.recipe_pass.first().delete()
+        self.assertEqual(len(self.assertInvalidated()), 2)
+
+    def test_ingredient_renamed(self):
+        ingredient = self.ingredients[0]
+        ingredient.name = 'Переименованный'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        self.assertIn(('Переименованный', 'г', 1), self.assertInvalidated())
+
+    def test_download_pdf(self):
+        self.client.force_authenticate(self.reader)
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/?format=pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertIn(b'DejaVuSans', content)
+
+    def test_recipe_deleted_through_api(self):
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.assertInvalidated(), [])
+
+    def test_recipe_updated_through_api(self):
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/',
+                {
+                    'ingredients': [
+                        {'id': self.ingredients[5].id, 'amount': 7}],
+                    'tags': [self.tags[0].id],
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            self.assertInvalidated(),
+            [(self.ingredients[5].name, 'г', 7)]
+        )
+
+
+class RecipeVersionTest(FoodgramTestCase):
+    "Версия рецепта меняется только после коммита"
+
+    def test_bumped_after_commit(self):
+        recipe = self.create_recipe(self.ingredients[:1])
+        version = get_recipe_versions(recipe.id)
+        recipe.name = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+            self.assertEqual(get_recipe_versions(recipe.id), version)
+        self.assertNotEqual(get_recipe_versions(recipe.id), version)
+
+
+class RecipeSearchTest(FoodgramTestCase):
+    "Поиск видит изменения рецепта, его состава и названий ингредиентов"
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.saffron = Ingredient.objects.create(
+                name='Шафран', measures='г')
+            self.cardamom = Ingredient.objects.create(
+                name='Кардамон', measures='г')
+        self.recipe = self.create_recipe([self.saffron])
+        self.create_recipe([self.cardamom])
+
+    def search(self, text):
+        response = self.client.get(
+            '/api/recipes/', {'search': text, 'limit': 6})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_found_by_ingredient(self):
+        self.assertEqual(self.search('шафран'), [self.recipe.id])
+
+    def test_recipe_renamed(self):
+        self.recipe.name = 'Плов'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        self.assertEqual(self.search('плов шафран'), [self.recipe.id])
+
+    def test_ingredients_replaced_through_api(self):
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/',
+                {
+                    'ingredients': [{'id': self.cardamom.id, 'amount': 1}],
+                    'tags': [self.tags[0].id],
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.search('шафран'), [])
+        self.assertIn(self.recipe.id, self.search('кардамон'))
+
+    def test_ingredient_renamed(self):
+        self.saffron.name = 'Куркума'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.saffron.save()
+        self.assertEqual(self.search('куркума'), [self.recipe.id])
+        self.assertEqual(self.search('шафран'), [])
+
+
+class CounterFieldsTest(FoodgramTestCase):
+    "Сохранение объекта не затирает счётчики, изменённые параллельно"
+
+    def test_recipe_save_keeps_favorites_count(self):
+        recipe = self.create_recipe(self.ingredients[:1])
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        recipe.name = 'Новое название'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_user_save_keeps_counters(self):
+        author = User.objects.get(id=self.author.id)
+        self.create_recipe(self.ingredients[:1])
+        UserFollowing.objects.create(user=self.reader, author=self.author)
+        author.first_name = 'Новое имя'
+        author.save()
+        author.refresh_from_db()
+        self.assertEqual(author.first_name, 'Новое имя')
+        self.assertEqual(
+            (author.recipes_count, author.followers_count), (1, 1))
+
+
+class TagFilterTest(FoodgramTestCase):
+    "Фильтр по нескольким тегам не размножает рецепты"
+
+    def test_recipe_with_both_tags(self):
+        first, second = self.tags[:2]
+        self.create_recipe(self.ingredients[:1], tags=[first, second])
+        response = self.client.get(
+            f'/api/recipes/?tags={first.slug}&tags={second.slug}&limit=6')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class RecipeAuthorTest(FoodgramTestCase):
+    "Подписка на автора подставляется в ответ, а не в объект автора"
+
+    def test_author_is_not_modified(self):
+        recipe = self.create_recipe(self.ingredients[:1])
+        UserFollowing.objects.create(user=self.reader, author=self.author)
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.reader
+        data = RecipesSerializer(recipe, context={'request': request}).data
+        self.assertEqual(
+            list(data['author']), list(UserSerializer.Meta.fields))
+        self.assertTrue(data['author']['is_subscribed'])
+        self.assertFalse(hasattr(recipe.author, 'is_subscribed'))
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(FoodgramTestCase):
+    "Каждый эндпоинт из QUERY_BUDGETS укладывается в свой бюджет"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.create_recipes(12)
+
+    def test_endpoints_within_budget(self):
+        recipe = Recipe.objects.filter(author=self.author).first()
+        ShopCart.objects.create(user=self.reader, recipe=recipe)
+        UserFollowing.objects.create(user=self.reader, author=self.author)
+        token = Token.objects.create(user=self.reader)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        ingredient = self.ingredients[0]
+        endpoints = {
+            'TagViewSet.list': '/api/tags/',
+            'TagViewSet.retrieve': f'/api/tags/{self.tags[0].id}/',
+            'IngredientViewSet.list': '/api/ingredients/?name=Ингр',
+            'IngredientViewSet.retrieve':
+                f'/api/ingredients/{ingredient.id}/',
+            'RecipesViewSet.list': '/api/recipes/?limit=6',
+            'RecipesViewSet.retrieve': f'/api/recipes/{recipe.id}/',
+            'RecipesViewSet.feed': '/api/recipes/feed/?limit=6',
+            'RecipesViewSet.cookable':
+                f'/api/recipes/cookable/?ingredients={ingredient.id}',
+            'RecipesViewSet.download_shopping_cart':
+                '/api/recipes/download_shopping_cart/',
+            'CustomUserViewSet.list': '/api/users/?limit=6',
+            'CustomUserViewSet.retrieve': f'/api/users/{self.author.id}/',
+            'CustomUserViewSet.me': '/api/users/me/',
+            'CustomUserViewSet.subscriptions':
+                '/api/users/subscriptions/?limit=6',
+        }
+        self.assertEqual(set(endpoints), set(settings.QUERY_BUDGETS))
+        for endpoint, url in endpoints.items():
+            with self.subTest(endpoint=endpoint):
+                cache.clear()
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
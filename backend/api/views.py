@@ -1,18 +1,48 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.db.models import (
+    Exists, OuterRef, Prefetch, Subquery, Value
+)
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import IntegerField, ListField
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from .filters import RecipeFilter
-from .pagination import LimitPageNumberPagination
+from .cache import FEED_TIMEOUT, feed_key, get_shopping_list
+from .filters import IngredientFilter, RecipeFilter
+from .lean import (
+    IngredientLeanSerializer, RecipeLeanSerializer, TagLeanSerializer
+)
+from .metrics import TimedSerializer
+from .mixins import (
+    AnonymousCacheMixin,
+    CatalogCacheMixin,
+    FastReadMixin,
+    TimedSerializerMixin
+)
+from .pagination import (
+    LimitCursorPagination,
+    LimitPageNumberPagination,
+    LimitPageOrCursorPagination,
+    RecipePagination
+)
 from .permissions import IsAuthorOrReadOnly
-from recipes.models import Favorite, Ingredient, Recipe, ShopCart, Tag
+from .renderers import (
+    ShoppingListCSVRenderer,
+    ShoppingListPDFRenderer,
+    ShoppingListTextRenderer
+)
+from recipes.models import (
+    Favorite, Ingredient, Recipe, ShopCart, Tag
+)
 from users.models import User, UserFollowing
+from .search import match_recipes
 from .serializers import (
+    CookableRecipesSerializer,
     CreateOrUpdateRecipes,
     FollowGetSerializer,
     IngredientSerializer,
@@ -24,33 +54,94 @@ from .serializers import (
 from .utils import add_to, delete_from
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(TimedSerializerMixin, CatalogCacheMixin, FastReadMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    lean_serializer_class = TagLeanSerializer
     pagination_class = None
     permission_classes = (AllowAny,)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(TimedSerializerMixin, CatalogCacheMixin,
+                        FastReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    lean_serializer_class = IngredientLeanSerializer
     pagination_class = None
     permission_classes = (AllowAny,)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = IngredientFilter
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(TimedSerializerMixin, AnonymousCacheMixin,
+                     FastReadMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
+    lean_serializer_class = RecipeLeanSerializer
     http_method_names = ['get', 'post', 'patch', 'create', 'delete']
     filter_backends = (DjangoFilterBackend,)
-    pagination_class = LimitPageNumberPagination
+    pagination_class = RecipePagination
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve', 'feed', 'cookable'):
+            # Теги и ингредиенты подгружает RecipesSerializer, только для
+            # рецептов, которых ещё нет в кеше.
+            queryset = queryset.defer('search_document').select_related(
+                'author')
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                author_is_subscribed=Value(False)
+            )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShopCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            author_is_subscribed=Exists(UserFollowing.objects.filter(
+                user=user, author=OuterRef('author')))
+        )
+
     def get_serializer_class(self):
-        if self.action == "list" or self.action == "retrieve":
+        if self.action == "cookable":
+            return CookableRecipesSerializer
+        if self.action in ("list", "retrieve", "feed"):
             return RecipesSerializer
         return CreateOrUpdateRecipes
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=LimitCursorPagination
+    )
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        limit = request.query_params.get('limit')
+        first_page = set(request.query_params) <= {'limit'}
+        key = feed_key(request.user.id)
+        if first_page:
+            cached = cache.get(key)
+            if cached is not None and cached['limit'] == limit:
+                return Response(cached['data'])
+        queryset = self.get_queryset().filter(author__in=Subquery(
+            UserFollowing.objects.filter(
+                user=request.user
+            ).values('author_id')
+        ))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        if first_page:
+            cache.set(key, {'limit': limit, 'data': response.data},
+                      FEED_TIMEOUT)
+        return response
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -71,33 +162,55 @@ class RecipesViewSet(viewsets.ModelViewSet):
             return add_to(ShopCart, request, request.user, pk)
         return delete_from(ShopCart, request.user, pk, request)
 
+    @action(detail=False, methods=['get'])
+    def cookable(self, request):
+        """Рецепты по набору ингредиентов: ?ingredients=1&ingredients=2."""
+        ingredient_ids = [
+            value
+            for param in request.query_params.getlist('ingredients')
+            for value in param.split(',')
+            if value
+        ]
+        try:
+            ingredient_ids = ListField(
+                child=IntegerField(), allow_empty=False
+            ).run_validation(ingredient_ids)
+        except ValidationError as error:
+            raise ValidationError({'ingredients': error.detail})
+        queryset = match_recipes(
+            self.filter_queryset(self.get_queryset()), ingredient_ids)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
     @action(
         detail=False,
         methods=['get'],
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListPDFRenderer
+        ]
     )
     def download_shopping_cart(self, request):
-        ingredients = Ingredient.objects.filter(
-            recipe_pass__recipe__shopping_cart__user=request.user
-        ).annotate(
-            amount=Sum("recipe_pass__amount")
-        ).values_list(
-            "name",
-            "measures",
-            "amount",
-        )
-        shopping_cart = 'Список покупок:\n'
-
-        for name, measure, amount in ingredients:
-            shopping_cart += f'{name.capitalize()} {amount} {measure},\n'
-        response = HttpResponse(shopping_cart,
-                                content_type='text/plain')
+        ingredients = get_shopping_list(request.user)
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients), content_type=content_type)
         response['Content-Disposition'] = (
-            'attachment; filename=Shopping list.txt'
+            f'attachment; filename="Shopping list.{renderer.format}"'
         )
         return response
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(TimedSerializerMixin, UserViewSet):
     queryset = User.objects.all()
     http_method_names = ['get', 'post', 'delete']
     pagination_class = LimitPageNumberPagination
@@ -115,7 +228,8 @@ class CustomUserViewSet(UserViewSet):
                 author=author,
                 user=request.user
             )
-            serializer = UserFollowersSerializer(user_following)
+            serializer = TimedSerializer(
+                UserFollowersSerializer(user_following))
             return Response(
                 data=serializer.data,
                 status=status.HTTP_201_CREATED
@@ -133,20 +247,42 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def me(self, request):
-        serializer = UserSerializer(
-            request.user, context={'request': request})
+        serializer = TimedSerializer(UserSerializer(
+            request.user, context={'request': request}))
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated],
-        pagination_class=LimitPageNumberPagination
+        pagination_class=LimitPageOrCursorPagination
     )
     def subscriptions(self, request):
-        user = request.user
-        queryset = User.objects.filter(subscribing__user=user)
+        recipes_limit = self.get_recipes_limit()
+        recipes = Recipe.objects.all()
+        if recipes_limit == 0:
+            recipes = recipes.none()
+        elif recipes_limit is not None:
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('id')[:recipes_limit]
+            ))
+        queryset = User.objects.filter(
+            subscribing__user=request.user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        )
         pages = self.paginate_queryset(queryset)
-        serializer = FollowGetSerializer(
-            pages, many=True, context={'request': request})
+        serializer = TimedSerializer(FollowGetSerializer(
+            pages, many=True, context={'request': request}))
         return self.get_paginated_response(serializer.data)
+
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit is None:
+            return None
+        try:
+            return IntegerField(min_value=0).run_validation(recipes_limit)
+        except ValidationError as error:
+            raise ValidationError({'recipes_limit': error.detail})
@@ -1,4 +1,5 @@
 import os
+import sys
 
 from dotenv import load_dotenv
 
@@ -11,6 +12,8 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'default')
 
 DEBUG = False
 
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = ['*']
 
 INSTALLED_APPS = [
@@ -29,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,12 +67,12 @@ AUTH_USER_MODEL = "users.User"
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'HOST': 'db',
-        'PORT': '5432',
-        'NAME': 'final',
-        'USER': 'postgres',
-        'PASSWORD': 'postgres',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
+        'HOST': os.getenv('DB_HOST', 'db'),
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'NAME': os.getenv('DB_NAME', 'final'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
     }
 }
 
@@ -116,4 +120,61 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MAX_IMAGE_UPLOAD_SIZE = 5 * 1024 * 1024
+MAX_IMAGE_PIXELS = 25_000_000
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+FAST_READ = os.getenv('FAST_READ', 'False') == 'True'
 EMAIL = "pahkarus@gmail.com"
+
+# Сколько SQL-запросов может сделать эндпоинт, см. api/middleware.py.
+QUERY_BUDGETS = {
+    'TagViewSet.list': 2,
+    'TagViewSet.retrieve': 2,
+    'IngredientViewSet.list': 3,
+    'IngredientViewSet.retrieve': 2,
+    'RecipesViewSet.list': 6,
+    'RecipesViewSet.retrieve': 4,
+    'RecipesViewSet.feed': 4,
+    'RecipesViewSet.cookable': 5,
+    'RecipesViewSet.download_shopping_cart': 2,
+    'CustomUserViewSet.list': 3,
+    'CustomUserViewSet.retrieve': 2,
+    'CustomUserViewSet.me': 2,
+    'CustomUserViewSet.subscriptions': 4,
+}
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            # Тесты не печатают строку метрик на каждый запрос.
+            'level': os.getenv(
+                'METRICS_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+        },
+    },
+}
+
+# Версии справочников и рецептов хранятся в кеше и должны быть видны всем
+# воркерам gunicorn и management-командам, поэтому кеш по умолчанию общий:
+# memcached из infra/docker-compose.yml. Вытесненная версия создаётся
+# заново, и записи под старой версией просто перестают читаться.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.memcached.PyMemcacheCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'memcached:11211'),
+    }
+}
+if CACHE_BACKEND.endswith('.PyMemcacheCache'):
+    # Недоступный memcached даёт промахи кеша, а не ошибки запросов.
+    CACHES['default']['OPTIONS'] = {
+        'no_delay': True,
+        'ignore_exc': True,
+    }
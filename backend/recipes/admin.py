@@ -15,7 +15,7 @@ class IngredientPassAdmin(admin.TabularInline):
 
 
 class RecipesAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author')
+    list_display = ('name', 'author', 'get_favorite_count')
     list_filter = ('name', 'author', 'tags')
     search_fields = ('author__username', 'name', 'tags__name')
     inlines = (
@@ -23,9 +23,9 @@ class RecipesAdmin(admin.ModelAdmin):
         IngredientPassAdmin
     )
 
-    @admin.display(description='В избранном')
+    @admin.display(description='В избранном', ordering='favorites_count')
     def get_favorite_count(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
 
 class IngredientAdmin(admin.ModelAdmin):
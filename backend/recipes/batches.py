@@ -0,0 +1,39 @@
+from threading import local
+
+from django.db import transaction
+
+
+class CommitBatch:
+    """Копит значения из сигналов и обрабатывает их после коммита.
+
+    Сигналы приходят на каждую строку; батч собирает их значения
+    в множество текущего потока, а handler получает его одним вызовом
+    из transaction.on_commit. Вне транзакции handler вызывается сразу.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._local = local()
+
+    def add(self, values):
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            values = set(values)
+            if values:
+                self.handler(values)
+            return
+        pending = getattr(self._local, 'values', None)
+        if pending is None or not self._scheduled(connection):
+            # Обработчик уже отработал или откатился вместе с транзакцией.
+            pending = self._local.values = set()
+            transaction.on_commit(self.flush)
+        pending.update(values)
+
+    def _scheduled(self, connection):
+        return any(hook[1] == self.flush for hook in connection.run_on_commit)
+
+    def flush(self):
+        values = getattr(self._local, 'values', None)
+        self._local.values = None
+        if values:
+            self.handler(values)
@@ -0,0 +1,30 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset, field):
+    """Подзапрос с количеством строк queryset для внешней записи."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('id')).values('count')
+    ), 0)
+
+
+def recount(apps=global_apps):
+    """Пересчитывает счётчики избранного, рецептов и подписчиков.
+
+    В миграции принимает исторический реестр моделей.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    User = apps.get_model('users', 'User')
+    UserFollowing = apps.get_model('users', 'UserFollowing')
+    recipes = Recipe.objects.update(
+        favorites_count=count_of(Favorite.objects, 'recipe'))
+    users = User.objects.update(
+        recipes_count=count_of(Recipe.objects, 'author'),
+        followers_count=count_of(UserFollowing.objects, 'author'),
+    )
+    return recipes, users
@@ -0,0 +1,191 @@
+import base64
+import json
+import logging
+import math
+import statistics
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def image_base64():
+    buffer = BytesIO()
+    Image.new('RGB', (600, 400), '#E8E0D0').save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет основные эндпоинты API через тестовый клиент и '
+        'сохраняет результаты в JSON для сравнения между коммитами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', default='bench.json')
+        parser.add_argument('--label', default='',
+                            help='Метка прогона, например хеш коммита')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Замерять без кеша (DummyCache)')
+
+    def handle(self, *args, **options):
+        # Метрики каждого запроса из api.middleware здесь только мешают.
+        logging.getLogger('api.middleware').setLevel(logging.WARNING)
+        user = self.pick_user()
+        self.client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.repeat = options['repeat']
+        self.created = []
+        caches = NO_CACHE if options['no_cache'] else None
+        try:
+            if caches:
+                with override_settings(CACHES=caches):
+                    results = self.run_cases()
+            else:
+                results = self.run_cases()
+        finally:
+            self.delete_created()
+        report = {
+            'label': options['label'],
+            'date': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'cache': not options['no_cache'],
+            'repeat': self.repeat,
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name}: медиана {result["median_ms"]} мс, '
+                f'p95 {result["p95_ms"]} мс, '
+                f'запросов {result["queries"]}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'))
+
+    def pick_user(self):
+        """Пользователь с подписками и корзиной, у кого их больше всех."""
+        user = User.objects.filter(
+            shopping_cart__isnull=False
+        ).annotate(
+            follows=Count('subscriber', distinct=True)
+        ).order_by('-follows').first()
+        if user is None:
+            raise CommandError(
+                'Нет данных для замеров, сначала выполните generate_data')
+        return user
+
+    def run_cases(self):
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        ingredients = list(Ingredient.objects.values_list('id', flat=True)[:3])
+        prefix = Ingredient.objects.values_list('name', flat=True)[0][:3]
+        cases = {
+            'recipes_list': ('/api/recipes/', {'limit': 6}),
+            'recipes_list_filtered': (
+                '/api/recipes/', {'limit': 6, 'is_favorited': 1, 'tags': tags}
+            ),
+            'recipes_search': (
+                '/api/recipes/',
+                {'limit': 6, 'search': recipe.name.split()[0]}
+            ),
+            'recipe_detail': (f'/api/recipes/{recipe.id}/', None),
+            'subscriptions': (
+                '/api/users/subscriptions/', {'limit': 6, 'recipes_limit': 3}
+            ),
+            'shopping_list': ('/api/recipes/download_shopping_cart/', None),
+            'ingredient_search': ('/api/ingredients/', {'name': prefix}),
+        }
+        results = {
+            name: self.measure('get', url, params)
+            for name, (url, params) in cases.items()
+        }
+        body = {
+            'name': 'Замер',
+            'text': 'Рецепт для замера',
+            'cooking_time': 10,
+            'image': image_base64(),
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredients': [
+                {'id': ingredient, 'amount': 100}
+                for ingredient in ingredients
+            ],
+        }
+        results['recipe_create'] = self.measure(
+            'post', '/api/recipes/', body)
+        del body['image']
+        body['ingredients'] = body['ingredients'][:2]
+        results['recipe_update'] = self.measure(
+            'patch', f'/api/recipes/{self.created[-1]}/', body)
+        return results
+
+    def delete_created(self):
+        """Удаляет рецепты, созданные замерами, вместе с картинками."""
+        for recipe in Recipe.objects.filter(id__in=self.created):
+            for field in ('image', 'thumbnail', 'thumbnail_webp',
+                          'image_webp'):
+                getattr(recipe, field).delete(save=False)
+            recipe.delete()
+
+    def request(self, method, url, body):
+        if method == 'get':
+            response = self.client.get(url, body)
+        else:
+            response = getattr(self.client, method)(url, body, format='json')
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{method.upper()} {url}: {response.status_code}')
+        if method == 'post':
+            self.created.append(response.json()['id'])
+        return size
+
+    def measure(self, method, url, body):
+        """Первый запрос прогревает кеши, остальные замеряются."""
+        self.request(method, url, body)
+        timings = []
+        for _ in range(self.repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                size = self.request(method, url, body)
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            'method': method.upper(),
+            'url': url,
+            'params': body if method == 'get' else None,
+            'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[math.ceil(len(timings) * 0.95) - 1], 2),
+            'min_ms': round(timings[0], 2),
+            'max_ms': round(timings[-1], 2),
+            'queries': len(queries),
+            'size': size,
+        }
@@ -0,0 +1,85 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db.models import Value
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from api.lean import (
+    IngredientLeanSerializer, RecipeLeanSerializer, TagLeanSerializer
+)
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import (
+    IngredientSerializer, RecipesSerializer, TagSerializer
+)
+from recipes.models import Ingredient, Recipe, Tag
+
+CACHE_MODES = (
+    ('без кеша', 'django.core.cache.backends.dummy.DummyCache'),
+    ('с кешем', 'django.core.cache.backends.locmem.LocMemCache'),
+)
+
+
+def recipes_page(limit):
+    return list(Recipe.objects.defer('search_document').select_related(
+        'author'
+    ).annotate(
+        is_favorited=Value(False),
+        is_in_shopping_cart=Value(False),
+        author_is_subscribed=Value(False)
+    )[:limit])
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает обычный и быстрый путь чтения: ModelSerializer и '
+        'JSONRenderer против сериализаторов на .values() и orjson'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=6,
+                            help='Рецептов на странице')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        repeat = options['repeat']
+        context = {'request': RequestFactory().get('/api/recipes/')}
+        cases = (
+            ('recipes', lambda: recipes_page(limit),
+             RecipesSerializer, RecipeLeanSerializer),
+            ('tags', Tag.objects.all,
+             TagSerializer, TagLeanSerializer),
+            ('ingredients', Ingredient.objects.all,
+             IngredientSerializer, IngredientLeanSerializer),
+        )
+        self.stdout.write(f'orjson: {"да" if orjson else "нет"}')
+        for mode, backend in CACHE_MODES:
+            caches = {'default': {'BACKEND': backend, 'LOCATION': 'bench'}}
+            with override_settings(CACHES=caches):
+                for name, objects, slow, fast in cases:
+                    slow_time, slow_body = self.measure(
+                        objects, slow, JSONRenderer(), context, repeat)
+                    fast_time, fast_body = self.measure(
+                        objects, fast, FastJSONRenderer(), context, repeat)
+                    self.stdout.write(
+                        f'{name} ({mode}): {slow_time:.3f} мс -> '
+                        f'{fast_time:.3f} мс, '
+                        f'x{slow_time / fast_time:.1f}, '
+                        f'ответы совпадают: '
+                        f'{"да" if slow_body == fast_body else "нет"}'
+                    )
+
+    def measure(self, objects, serializer_class, renderer, context, repeat):
+        """Среднее время на запрос: выборка, сериализация и рендеринг."""
+        body = self.render(objects, serializer_class, renderer, context)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            self.render(objects, serializer_class, renderer, context)
+        elapsed = (time.perf_counter() - started) * 1000 / repeat
+        return elapsed, body
+
+    def render(self, objects, serializer_class, renderer, context):
+        data = serializer_class(objects(), many=True, context=context).data
+        return renderer.render(data)
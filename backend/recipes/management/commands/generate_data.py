@@ -0,0 +1,194 @@
+import random
+import time
+import uuid
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+from PIL import Image
+
+from api.cache import bump_catalog_version
+from recipes.models import (
+    Favorite, Ingredient, IngredientPass, Recipe, ShopCart, Tag, TagPass
+)
+from recipes.search import make_search_document
+from users.models import User, UserFollowing
+
+# У сгенерированных рецептов одна общая картинка.
+PLACEHOLDER_IMAGE = 'recipes/images/generated.png'
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'dinner'),
+    ('Ужин', '#8775D2', 'supper'),
+)
+DISHES = ('Суп', 'Салат', 'Пирог', 'Рагу', 'Омлет', 'Каша', 'Запеканка',
+          'Паста', 'Плов', 'Котлеты', 'Блины', 'Соус')
+STYLES = ('по-домашнему', 'на скорую руку', 'по-летнему', 'с сыром',
+          'с зеленью', 'с грибами', 'с курицей', 'по-бабушкиному')
+
+
+def zipf_weights(count, exponent=1.1):
+    """Накопленные веса: первые элементы популярнее остальных."""
+    return list(accumulate(1 / (rank ** exponent)
+                           for rank in range(1, count + 1)))
+
+
+def sample(population, cum_weights, k):
+    """Выборка без повторов с учётом популярности."""
+    k = min(k, len(population))
+    chosen = set()
+    while len(chosen) < k:
+        chosen.update(random.choices(population, cum_weights=cum_weights,
+                                     k=k - len(chosen)))
+    return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетические данные: пользователей, рецепты, '
+        'ингредиенты рецептов, избранное, корзины и подписки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Среднее число избранных на пользователя')
+        parser.add_argument('--cart', type=int, default=4,
+                            help='Среднее число рецептов в корзине')
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Среднее число подписок на пользователя')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['recipes'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь и рецепт')
+        ingredients = list(Ingredient.objects.values_list('id', 'name'))
+        if not ingredients:
+            raise CommandError(
+                'Справочник ингредиентов пуст, сначала выполните import')
+        random.seed(options['seed'])
+        random.shuffle(ingredients)
+        self.batch_size = options['batch_size']
+        self.run = uuid.uuid4().hex[:6]
+        started = time.monotonic()
+        with transaction.atomic():
+            tags = self.create_tags()
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(
+                users, options['recipes'], ingredients, tags)
+            self.create_relations(users, recipes, options)
+        self.save_placeholder()
+        # bulk_create не вызывает сигналы: счётчики и кеши обновляем сами.
+        call_command('recount', stdout=self.stdout)
+        bump_catalog_version(Tag)
+        bump_catalog_version(Recipe)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Сгенерировано за {elapsed:.1f} с: пользователей {len(users)}, '
+            f'рецептов {len(recipes)}'
+        ))
+
+    def save_placeholder(self):
+        if default_storage.exists(PLACEHOLDER_IMAGE):
+            return
+        buffer = BytesIO()
+        Image.new('RGB', (600, 400), '#E8E0D0').save(buffer, 'PNG')
+        default_storage.save(PLACEHOLDER_IMAGE, ContentFile(buffer.getvalue()))
+
+    def create_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password(self.run)
+        User.objects.bulk_create((
+            User(
+                email=f'user{self.run}{number}@example.com',
+                username=f'user{self.run}{number}',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            ) for number in range(count)
+        ), batch_size=self.batch_size)
+        return list(User.objects.filter(
+            username__startswith=f'user{self.run}'
+        ).values_list('id', flat=True))
+
+    def create_recipes(self, users, count, ingredients, tags):
+        """Рецепты с авторами и ингредиентами по закону Ципфа."""
+        authors = random.choices(
+            users, cum_weights=zipf_weights(len(users)), k=count)
+        ingredient_weights = zipf_weights(len(ingredients))
+        compositions = []
+        recipes = []
+        for number, author in enumerate(authors):
+            composition = sample(
+                ingredients, ingredient_weights,
+                max(1, round(random.gauss(8, 3))))
+            name = (f'{random.choice(DISHES)} {random.choice(STYLES)} '
+                    f'{self.run}-{number}')
+            text = f'{name}: смешать, довести до готовности и подать.'
+            recipes.append(Recipe(
+                author_id=author,
+                name=name,
+                text=text,
+                cooking_time=random.randint(5, 180),
+                image=PLACEHOLDER_IMAGE,
+                search_document=make_search_document(
+                    name, text, sorted(title for _, title in composition)),
+            ))
+            compositions.append(composition)
+        Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+        ids = dict(Recipe.objects.filter(
+            name__contains=f' {self.run}-'
+        ).values_list('name', 'id'))
+        recipe_ids = [ids[recipe.name] for recipe in recipes]
+        IngredientPass.objects.bulk_create((
+            IngredientPass(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                           amount=random.randint(1, 500))
+            for recipe_id, composition in zip(recipe_ids, compositions)
+            for ingredient_id, _ in composition
+        ), batch_size=self.batch_size)
+        TagPass.objects.bulk_create((
+            TagPass(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in random.sample(tags, random.randint(1, len(tags)))
+        ), batch_size=self.batch_size)
+        return recipe_ids
+
+    def create_relations(self, users, recipes, options):
+        """Избранное, корзины и подписки: популярное выбирают чаще."""
+        recipe_weights = zipf_weights(len(recipes))
+        author_weights = zipf_weights(len(users))
+        favorites, carts, follows = [], [], []
+        for user in users:
+            for recipe in sample(recipes, recipe_weights,
+                                 self.count(options['favorites'])):
+                favorites.append(Favorite(user_id=user, recipe_id=recipe))
+            for recipe in sample(recipes, recipe_weights,
+                                 self.count(options['cart'])):
+                carts.append(ShopCart(user_id=user, recipe_id=recipe))
+            authors = sample(users, author_weights,
+                             self.count(options['follows']))
+            follows.extend(
+                UserFollowing(user_id=user, author_id=author)
+                for author in authors if author != user
+            )
+        Favorite.objects.bulk_create(favorites, batch_size=self.batch_size)
+        ShopCart.objects.bulk_create(carts, batch_size=self.batch_size)
+        UserFollowing.objects.bulk_create(
+            follows, batch_size=self.batch_size)
+
+    def count(self, mean):
+        """Число связей пользователя: у большинства мало, у немногих много."""
+        return int(random.expovariate(1 / mean)) if mean else 0
@@ -1,18 +1,106 @@
 import csv
-from django.core.management import BaseCommand
+import json
+import os
+import re
+import time
 
+from django.core.management import BaseCommand, CommandError
+
+from api.cache import bump_catalog_version
 from recipes.models import Ingredient
 
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'ingredients.csv')
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_csv(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if row:
+                yield row[0], row[1]
+
+
+def read_json(path, chunk_size=JSON_CHUNK_SIZE):
+    """Разбирает массив JSON по одному элементу, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise CommandError(f'Ожидается массив JSON: {path}')
+        position = 1
+        while True:
+            position = JSON_SEPARATORS.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise CommandError(f'Некорректный JSON: {error}')
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
 
 class Command(BaseCommand):
-    def handle(self, *args, **kwargs):
-        with open(
-            'recipes/management/commands/ingredients.csv',
-                'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                _, created = Ingredient.objects.get_or_create(
-                    name=row[0],
-                    measures=row[1]
-                )
-        print("Импорт успешно завершен")
+    help = 'Загружает справочник ингредиентов из CSV или JSON файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        seen = set(Ingredient.objects.values_list('name', 'measures'))
+        batch = []
+        read = 0
+        for name, measures in READERS[file_format](path):
+            read += 1
+            key = (name.strip(), measures.strip())
+            if key in seen:
+                continue
+            seen.add(key)
+            batch.append(Ingredient(name=key[0], measures=key[1]))
+            if len(batch) >= options['batch_size']:
+                self.save(batch)
+                batch = []
+        self.save(batch)
+        # ignore_conflicts пропускает строки, добавленные параллельно,
+        # поэтому число новых записей считается по таблице.
+        created = Ingredient.objects.count() - before
+        if created:
+            bump_catalog_version(Ingredient)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт успешно завершен: прочитано {read}, '
+            f'добавлено {created} за {elapsed:.2f} с '
+            f'({read / elapsed if elapsed else read:.0f} строк/с)'
+        ))
+
+    def save(self, batch):
+        Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from recipes.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает текст для поиска у всех рецептов'
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_search_documents()
+        self.stdout.write(self.style.SUCCESS(
+            f'Текст для поиска пересобран: рецептов {rebuilt}'
+        ))
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def merge_duplicates(apps, schema_editor):
+    """Склеивает ингредиенты с одинаковыми названием и единицей.
+
+    Ссылки рецептов переносятся на ингредиент с меньшим id; если рецепт
+    уже ссылается на него, дубль из рецепта удаляется.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientPass = apps.get_model('recipes', 'IngredientPass')
+    groups = {}
+    for pk, name, measures in Ingredient.objects.order_by('id').values_list(
+        'id', 'name', 'measures'
+    ):
+        groups.setdefault((name, measures), []).append(pk)
+    for main, *duplicates in groups.values():
+        for duplicate in duplicates:
+            IngredientPass.objects.filter(
+                ingredient_id=duplicate,
+                recipe__in=IngredientPass.objects.filter(
+                    ingredient_id=main).values('recipe')
+            ).delete()
+            IngredientPass.objects.filter(
+                ingredient_id=duplicate).update(ingredient_id=main)
+        Ingredient.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_fill_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def fill_created(apps, schema_editor):
+    """Даты для старых рецептов: новее тот, у кого больше id.
+
+    Точное время публикации неизвестно, поэтому рецепты получают
+    даты с шагом в секунду до момента миграции, сохраняя порядок.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipes = list(Recipe.objects.filter(created__isnull=True).order_by(
+        '-id').only('id'))
+    now = timezone.now()
+    for offset, recipe in enumerate(recipes):
+        recipe.created = now - timedelta(seconds=offset)
+    Recipe.objects.bulk_update(recipes, ['created'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_created'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+    ]
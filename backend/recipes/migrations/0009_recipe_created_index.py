@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_fill_recipe_created'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='created',
+            field=models.DateTimeField(
+                auto_now_add=True, verbose_name='Дата публикации'),
+        ),
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={
+                'ordering': ('-created', '-id'),
+                'verbose_name': 'Рецепт',
+                'verbose_name_plural': 'Рецепты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-created', '-id'], name='recipe_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['author', '-created', '-id'],
+                name='recipe_author_created_idx'),
+        ),
+    ]
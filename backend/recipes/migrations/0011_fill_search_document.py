@@ -0,0 +1,37 @@
+from django.db import migrations
+
+from recipes.search import rebuild_search_documents
+
+SEARCH_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS recipe_search_document_idx '
+    'ON recipes_recipe USING gin '
+    "(to_tsvector('russian'::regconfig, COALESCE(search_document, '')))"
+)
+
+
+def fill_search_document(apps, schema_editor):
+    rebuild_search_documents(apps=apps, index_terms=False)
+
+
+def create_search_index(apps, schema_editor):
+    """GIN-индекс для полнотекстового поиска, только для Postgres."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SEARCH_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS recipe_search_document_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
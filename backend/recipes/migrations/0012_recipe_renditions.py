@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_fill_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(
+                blank=True, editable=False, upload_to='recipes/renditions/',
+                verbose_name='Миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail_webp',
+            field=models.ImageField(
+                blank=True, editable=False, upload_to='recipes/renditions/',
+                verbose_name='Миниатюра WebP'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_webp',
+            field=models.ImageField(
+                blank=True, editable=False, upload_to='recipes/renditions/',
+                verbose_name='Картинка WebP'),
+        ),
+    ]
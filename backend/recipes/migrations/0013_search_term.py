@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID')),
+                ('term', models.CharField(
+                    max_length=100, verbose_name='Слово')),
+                ('recipe', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='search_terms', to='recipes.recipe',
+                    verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Слово для поиска',
+                'verbose_name_plural': 'Слова для поиска',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(
+                fields=['term', 'recipe'], name='search_term_idx'),
+        ),
+    ]
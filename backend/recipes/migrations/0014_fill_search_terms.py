@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from recipes.search import rebuild_search_documents
+
+
+def fill_search_terms(apps, schema_editor):
+    """Слова для поиска нужны только базам без полнотекстового поиска."""
+    if schema_editor.connection.vendor != 'postgresql':
+        rebuild_search_documents(apps=apps, index_terms=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_search_term'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_terms, migrations.RunPython.noop),
+    ]
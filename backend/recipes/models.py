@@ -1,6 +1,7 @@
 from django.db import models
 
-from users.models import User
+from users.models import CounterFieldsMixin, User
+from .search import TERM_MAX_LENGTH
 
 
 class Ingredient(models.Model):
@@ -21,6 +22,11 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measures'],
+                name='unique_ingredient_measures')
+        ]
 
     def __str__(self):
         return self.name
@@ -55,7 +61,7 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='recipes',
@@ -71,6 +77,21 @@ class Recipe(models.Model):
                               verbose_name='Картинка',
                               blank=True,
                               )
+    thumbnail = models.ImageField(upload_to='recipes/renditions/',
+                                  verbose_name='Миниатюра',
+                                  blank=True,
+                                  editable=False,
+                                  )
+    thumbnail_webp = models.ImageField(upload_to='recipes/renditions/',
+                                       verbose_name='Миниатюра WebP',
+                                       blank=True,
+                                       editable=False,
+                                       )
+    image_webp = models.ImageField(upload_to='recipes/renditions/',
+                                   verbose_name='Картинка WebP',
+                                   blank=True,
+                                   editable=False,
+                                   )
     text = models.TextField(verbose_name='Текст рецепта',
                             blank=True,
                             )
@@ -90,16 +111,71 @@ class Recipe(models.Model):
         verbose_name='Время приготовления',
         blank=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата публикации',
+        auto_now_add=True,
+    )
+    search_document = models.TextField(
+        verbose_name='Текст для поиска',
+        blank=True,
+        default='',
+        editable=False,
+    )
+
+    counter_fields = ('favorites_count',)
 
     class Meta:
-        ordering = ('-id',)
+        ordering = ('-created', '-id')
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-created', '-id'],
+                name='recipe_created_idx'),
+            models.Index(
+                fields=['author', '-created', '-id'],
+                name='recipe_author_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class SearchTerm(models.Model):
+    """Слово из текста для поиска рецепта.
+
+    Индекс для баз без полнотекстового поиска. На Postgres поиск идёт
+    по GIN-индексу, и таблица остаётся пустой.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='search_terms'
+    )
+    term = models.CharField(
+        verbose_name='Слово',
+        max_length=TERM_MAX_LENGTH,
+    )
+
+    class Meta:
+        verbose_name = 'Слово для поиска'
+        verbose_name_plural = 'Слова для поиска'
+        indexes = [
+            models.Index(fields=['term', 'recipe'], name='search_term_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
 class IngredientPass(models.Model):
     ingredient = models.ForeignKey(
         Ingredient,
@@ -0,0 +1,95 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.dispatch import Signal
+from PIL import Image
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = (
+    ('thumbnail', (400, 400), 'JPEG', 'jpg'),
+    ('thumbnail_webp', (400, 400), 'WEBP', 'webp'),
+    ('image_webp', (1280, 1280), 'WEBP', 'webp'),
+)
+
+# Копии сохраняются через update(), без post_save; кеши слушают этот сигнал.
+renditions_saved = Signal()
+
+executor = (
+    ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    if settings.IMAGE_WORKERS else None
+)
+
+
+def rendition_prefix(image_name):
+    return os.path.splitext(os.path.basename(image_name))[0] + '_'
+
+
+def renditions_outdated(recipe):
+    """Копии картинки отсутствуют или сделаны из прежнего файла."""
+    if not recipe.image:
+        return False
+    return not os.path.basename(recipe.image_webp.name).startswith(
+        rendition_prefix(recipe.image.name))
+
+
+def make_renditions(recipe_id):
+    """Делает уменьшенные копии и WebP-версии картинки рецепта."""
+    recipe = Recipe.objects.filter(id=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    source = recipe.image.name
+    try:
+        with recipe.image.open('rb') as file:
+            image = Image.open(file)
+            image.load()
+    except OSError as error:
+        logger.warning('Не удалось открыть %s: %s', source, error)
+        return
+    prefix = rendition_prefix(source)
+    renditions = {}
+    for field, size, image_format, extension in RENDITIONS:
+        rendition = image.copy()
+        rendition.thumbnail(size)
+        if image_format == 'JPEG' and rendition.mode != 'RGB':
+            rendition = rendition.convert('RGB')
+        buffer = BytesIO()
+        rendition.save(buffer, image_format, quality=80)
+        file_field = getattr(recipe, field)
+        file_field.save(
+            f'{prefix}{field}.{extension}',
+            ContentFile(buffer.getvalue()),
+            save=False
+        )
+        renditions[field] = file_field.name
+    if Recipe.objects.filter(id=recipe_id, image=source).update(**renditions):
+        renditions_saved.send(sender=Recipe, recipe_id=recipe_id)
+
+
+def run_in_worker(recipe_id):
+    try:
+        make_renditions(recipe_id)
+    except Exception:
+        logger.exception('Ошибка обработки картинки рецепта %s', recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(recipe_id):
+    """Запускает обработку картинки после коммита, вне цикла запроса.
+
+    Пул потоков заменяет очередь задач; при IMAGE_WORKERS = 0 обработка
+    выполняется сразу после коммита в том же потоке.
+    """
+    if executor is None:
+        transaction.on_commit(lambda: make_renditions(recipe_id))
+    else:
+        transaction.on_commit(
+            lambda: executor.submit(run_in_worker, recipe_id))
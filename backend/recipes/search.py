@@ -0,0 +1,71 @@
+import re
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import connections
+from django.dispatch import Signal
+
+SEARCH_CONFIG = 'russian'
+REBUILD_BATCH_SIZE = 1000
+TERM_MAX_LENGTH = 100
+WORD = re.compile(r'\w+')
+
+# Текст для поиска сохраняется после коммита; кеши слушают этот сигнал.
+search_rebuilt = Signal()
+
+
+def make_search_document(name, text, ingredient_names):
+    """Название, описание и ингредиенты рецепта одной строкой."""
+    return ' '.join([name, text, *ingredient_names]).lower()
+
+
+def search_terms(text):
+    """Слова текста для индекса SearchTerm, без повторов."""
+    return {word[:TERM_MAX_LENGTH] for word in WORD.findall(text.lower())}
+
+
+def rebuild_search_documents(recipe_ids=None, apps=global_apps,
+                             index_terms=None):
+    """Пересобирает search_document рецептов пачками по id.
+
+    Без recipe_ids обходит все рецепты. В миграции принимает
+    исторический реестр моделей. Слова документа попадают в SearchTerm
+    на всех базах, кроме Postgres. Возвращает число рецептов.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientPass = apps.get_model('recipes', 'IngredientPass')
+    if index_terms is None:
+        index_terms = connections[Recipe.objects.db].vendor != 'postgresql'
+    recipes = Recipe.objects.order_by('id').only('id', 'name', 'text')
+    if recipe_ids is not None:
+        recipes = recipes.filter(id__in=recipe_ids)
+    rebuilt = 0
+    last_id = 0
+    while True:
+        batch = list(recipes.filter(id__gt=last_id)[:REBUILD_BATCH_SIZE])
+        if not batch:
+            break
+        ingredient_names = defaultdict(list)
+        for recipe_id, name in IngredientPass.objects.filter(
+            recipe_id__in=[recipe.id for recipe in batch]
+        ).order_by('ingredient__name').values_list(
+            'recipe_id', 'ingredient__name'
+        ):
+            ingredient_names[recipe_id].append(name)
+        for recipe in batch:
+            recipe.search_document = make_search_document(
+                recipe.name, recipe.text, ingredient_names[recipe.id])
+        Recipe.objects.bulk_update(batch, ['search_document'])
+        if index_terms:
+            SearchTerm = apps.get_model('recipes', 'SearchTerm')
+            SearchTerm.objects.filter(recipe__in=batch).delete()
+            SearchTerm.objects.bulk_create(
+                SearchTerm(recipe_id=recipe.id, term=term)
+                for recipe in batch
+                for term in search_terms(recipe.search_document)
+            )
+        rebuilt += len(batch)
+        if len(batch) < REBUILD_BATCH_SIZE:
+            break
+        last_id = batch[-1].id
+    return rebuilt
@@ -0,0 +1,80 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import User
+from .batches import CommitBatch
+from .models import Favorite, Ingredient, IngredientPass, Recipe
+from .renditions import renditions_outdated, schedule_renditions
+from .search import rebuild_search_documents, search_rebuilt
+
+SEARCH_FIELDS = frozenset(['name', 'text'])
+
+
+def rebuild_search(recipe_ids):
+    rebuild_search_documents(recipe_ids)
+    search_rebuilt.send(sender=Recipe, recipe_ids=recipe_ids)
+
+
+def rebuild_ingredients_search(ingredient_ids):
+    recipe_ids = set(IngredientPass.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values_list('recipe_id', flat=True))
+    if recipe_ids:
+        rebuild_search(recipe_ids)
+
+
+# Текст для поиска собирается после коммита, когда состав рецепта,
+# сохранённый в той же транзакции через bulk_create, уже записан.
+recipes_search = CommitBatch(rebuild_search)
+ingredients_search = CommitBatch(rebuild_ingredients_search)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(id=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    Recipe.objects.filter(id=instance.recipe_id).update(
+        favorites_count=Greatest(F('favorites_count') - 1, 0))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(id=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    if renditions_outdated(instance):
+        schedule_renditions(instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    User.objects.filter(id=instance.author_id).update(
+        recipes_count=Greatest(F('recipes_count') - 1, 0))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_changed(sender, instance, update_fields, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & update_fields:
+        recipes_search.add([instance.id])
+
+
+@receiver((post_save, post_delete), sender=IngredientPass)
+def ingredient_pass_search_changed(sender, instance, **kwargs):
+    recipes_search.add([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_changed(sender, instance, created, **kwargs):
+    if not created:
+        ingredients_search.add([instance.id])
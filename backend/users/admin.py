@@ -10,6 +10,8 @@ class UserAdmin(admin.ModelAdmin):
         'username',
         'email',
         'role',
+        'recipes_count',
+        'followers_count',
     )
 
     list_filter = ("username", 'email')